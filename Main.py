@@ -5,6 +5,7 @@ import os
 import pandas as pd
 import config
 import reportfinder as rpf  # corp_code 찾는 용도만 사용
+import datamanage as dm
 from datetime import date
 
 
@@ -59,7 +60,7 @@ def main():
         try:
             csv_filename = f"_{target_corp}_손익계산서.csv"
             save_path = os.path.join(DartFile_path, csv_filename)
-            profit_table.to_csv(save_path, index=False, encoding='utf-8-sig')
+            dm.write_csv(profit_table, save_path, drop_empty_cols=True)
             print(f"\n성공: 손익계산서 데이터를 다음 경로에 저장했습니다:\n{os.path.abspath(save_path)}")
         except Exception as e:
             print(f"\n오류: CSV 파일 저장에 실패했습니다. - {e}")
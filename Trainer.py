@@ -72,6 +72,30 @@ labels = [
     ("LG", 2),
 ]
 
+def fetch(target_corp, begindate, enddate):
+    """기업 1곳 손익계산서 추출. 실패하면 None"""
+    # dart-fss로 사업보고서의 손익계산서만 DataFrame으로 가져오기(연결 기준)
+    try:
+        return rpf.get_income_statement_df_by_name(
+            corp_name=target_corp,
+            bgn_de=begindate,
+            end_de=enddate,
+            consolidated=True  # 필요 시 False로 바꿔 개별 재무제표 추출
+        )
+    except Exception as e:
+        print(f"\n손익계산서 추출 실패: {e}")
+        return None
+
+def postprocess(profit_table, target_corp, type_, out_dir):
+    """정제 + CSV 저장. 저장 경로, 남은 행이 없으면 None"""
+    head_profit_table = dm.drop_rows_where_class3_filled(profit_table)
+    if head_profit_table is None or head_profit_table.empty:
+        return None
+    csv_filename = f"_{target_corp}_{type_}.csv"
+    save_path = os.path.join(out_dir, csv_filename)
+    dm.write_csv(head_profit_table, save_path, drop_empty_cols=True)
+    return save_path
+
 def main():
     print("실행위치: " + homepath)
     os.makedirs(DartFile_path, exist_ok=True)
@@ -80,34 +104,28 @@ def main():
     enddate = today.strftime("%Y%m%d")
     begindate = one_year_ago.strftime("%Y%m%d")
 
-    # 2. 기업명 순환
-    for target_corp, type in labels:
-    
-        # 3. dart-fss로 사업보고서의 손익계산서만 DataFrame으로 가져오기(연결 기준)
-        try:
-            profit_table = rpf.get_income_statement_df_by_name(
-                corp_name=target_corp,
-                bgn_de=begindate,
-                end_de=enddate,
-                consolidated=True  # 필요 시 False로 바꿔 개별 재무제표 추출
-            )
-        except Exception as e:
-            print(f"\n손익계산서 추출 실패: {e}")
-            profit_table = None
+    # 기업목록은 한 번만 받아두고 모든 기업 조회에서 재사용 (실패해도 기업별 조회에서 다시 시도)
+    try:
+        rpf.get_corp_list()
+    except Exception as e:
+        print(f"\n기업목록 조회 실패: {e}")
 
-        # 4. dataframe 정제
-        head_profit_table = dm.drop_rows_where_class3_filled(profit_table)
+    # 2. 손익계산서 추출: DART 조회는 순차로 (dart_fss는 요청마다 0.2초 쉬며 분당 1,000건 한도를 지키는데,
+    #    스레드로 나누면 그 지연이 스레드마다 따로 걸리고 공유 requests.Session도 스레드 안전하지 않음)
+    tables = {(name, type_): fetch(name, begindate, enddate) for name, type_ in labels}
 
-        
-        # 4.1 CSV 저장(임시)
-        if head_profit_table is not None and not head_profit_table.empty:
+    # 3. dataframe 정제 + CSV 저장(임시)
+    for target_corp, type_ in labels:
+        save_path = None
+        profit_table = tables[(target_corp, type_)]
+        if profit_table is not None:
             try:
-                csv_filename = f"_{target_corp}_{type}.csv"
-                save_path = os.path.join(DartFile_path, csv_filename)
-                head_profit_table.to_csv(save_path, index=False, encoding='utf-8-sig')
-                print(f"\n성공: 손익계산서 데이터를 다음 경로에 저장했습니다:\n{os.path.abspath(save_path)}")
+                save_path = postprocess(profit_table, target_corp, type_, DartFile_path)
             except Exception as e:
                 print(f"\n오류: CSV 파일 저장에 실패했습니다. - {e}")
+                continue
+        if save_path:
+            print(f"\n성공: 손익계산서 데이터를 다음 경로에 저장했습니다:\n{os.path.abspath(save_path)}")
         else:
             print("\n손익계산서 데이터를 추출하지 못했습니다.")
             rpf.debug_income_statement(target_corp, begindate, enddate)
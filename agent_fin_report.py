@@ -1,93 +1,185 @@
 # C:\workspace\KUAIF3\agent_fin_report.py
 # 간단 AI 에이전트: 은행 손익계산서(XBRL CSV) → 지표/변화율 계산 → 요약리포트 생성
+import io
 import re
 import sys
+import hashlib
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+import datamanage as dm
+
 # ====== 경로 기본값 (원하면 그대로 두고 실행만 해도 됨) ======
 DEFAULT_CSV = Path(r"C:\workspace\KUAIF3\DartFile\_KB금융_손익계산서.csv")
 DEFAULT_OUTDIR = DEFAULT_CSV.parent / "out"
+# load_and_tidy 출력 형식이 바뀌면 올려서 기존 캐시 무효화
+TIDY_CACHE_VERSION = 2
+# 정규화 결과 pickle 캐시는 출력 폴더 아래 전용 폴더에 (입력 파일마다 최신 1개만 유지)
+TIDY_CACHE_DIRNAME = ".tidy_cache"
+TIDY_CACHE_MAX_FILES = 32
+# 예전 버전이 출력 폴더에 바로 쓰던 캐시 파일 이름
+LEGACY_TIDY_CACHE_RE = re.compile(r"tidy_[0-9a-f]{32}\.pkl")
+
+# ====== 정규식 (모듈 로드 시 1회 컴파일) ======
+PERIOD_RE = re.compile(r"(\d{8})(?:-(\d{8}))?")
+
+# 은행업 XBRL에서 자주 쓰는 라벨/컨셉 id
+OPERATING_RE = re.compile(r"ProfitLossFromOperatingActivities", re.IGNORECASE)   # 영업이익
+NET_RE       = re.compile(r"^ifrs-full_ProfitLoss$", re.IGNORECASE)              # 당기순이익
+INT_REV_RE   = re.compile(r"ifrs-full_RevenueFromInterest", re.IGNORECASE)       # 이자수익
+INS_REV_RE   = re.compile(r"ifrs-full_InsuranceRevenue", re.IGNORECASE)          # 보험수익
 
 # ====== 유틸 ======
 def extract_period(colname: str) -> str:
     """('20240101-20241231', ('연결재무제표',)) 같은 헤더에서 기간만 추출"""
     s = str(colname)
-    m = re.search(r"(\d{8})(?:-(\d{8}))?", s)
+    m = PERIOD_RE.search(s)
     if m:
         return f"{m.group(1)}-{m.group(2)}" if m.group(2) else m.group(1)
     return s
 
-def read_csv_flex(path: Path) -> pd.DataFrame:
+def read_csv_flex(path: Path, **read_kw) -> pd.DataFrame:
+    """utf-8-sig(BOM 없는 utf-8 포함)로 바로 파싱, 디코딩 오류일 때만 cp949로 재시도 (read_kw는 pd.read_csv로 전달)"""
     last = None
-    for enc in ("utf-8-sig", "cp949", "utf-8"):
+    for enc in ("utf-8-sig", "cp949"):
         try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception as e:
+            return pd.read_csv(path, encoding=enc, **read_kw)
+        except UnicodeDecodeError as e:
+            last = e
+        except Exception as e:  # 인코딩 문제가 아니면 다른 인코딩으로 다시 읽어도 소용없음
             last = e
+            break
     raise RuntimeError(f"CSV 읽기 실패: {path}\n마지막 오류: {last}")
 
-def find_row_index(concept_series: pd.Series, pattern: str, regex: bool = True):
-    m = concept_series.str.contains(pattern, case=False, regex=regex, na=False)
-    idx = list(concept_series.index[m])
-    return idx[0] if idx else None
+def read_csv_header(path: Path) -> pd.Index:
+    """첫 줄(헤더)만 읽어 열 이름 반환 (본문은 읽거나 디코딩하지 않음)"""
+    with open(path, "rb") as f:
+        line = f.readline()
+    for enc in ("utf-8-sig", "cp949"):
+        try:
+            text = line.decode(enc)
+        except UnicodeDecodeError:
+            continue
+        return pd.read_csv(io.StringIO(text), nrows=0).columns
+    raise RuntimeError(f"CSV 헤더 읽기 실패: {path}")
+
+_schema_cache = {}  # (절대경로, 수정시각) → 정규화에 필요한 열/dtype
+
+def read_tidy_source(csv_path: Path) -> pd.DataFrame:
+    """첫 열(concept) + 연결재무제표 열만 dtype을 지정해 읽음. 열 구성은 파일별로 헤더만 한 번 보고 결정"""
+    key = (str(csv_path.resolve()), csv_path.stat().st_mtime_ns)
+    read_kw = _schema_cache.get(key)
+    if read_kw is None:
+        header = read_csv_header(csv_path)
+        consol = [c for c in header if "연결재무제표" in str(c)]
+        # 금액은 조 단위까지 있어 float32로 줄이지 않고 추론(int64/float64)에 맡김
+        read_kw = {"usecols": list(dict.fromkeys([header[0], *consol])),
+                   "dtype": {header[0]: "string"}}
+        _schema_cache[key] = read_kw
+    return read_csv_flex(csv_path, **read_kw)
+
+def build_concept_index(concept_series: pd.Series) -> dict:
+    """소문자 컨셉 id → 첫 행 index (행 순서대로, 고유값만)"""
+    lowered = concept_series.str.lower()
+    first = ~lowered.duplicated()
+    return dict(zip(lowered[first], lowered.index[first]))
+
+def lookup_row_index(concept_index: dict, pattern: re.Pattern):
+    """pattern(대소문자 무시)에 맞는 첫 행 index. 전체 행 대신 고유 컨셉 id만 훑음
+    (dict가 행 순서를 유지하므로 처음 맞는 id의 첫 행 = 전체 열을 훑었을 때의 첫 행)"""
+    return next((idx for c, idx in concept_index.items() if pattern.search(c)), None)
 
 # ====== 핵심 로직 ======
 def load_and_tidy(csv_path: Path) -> pd.DataFrame:
-    df = read_csv_flex(csv_path)
+    df = read_tidy_source(csv_path)
 
     # 첫 번째 열: XBRL concept id/라벨 계열
     concept = df.iloc[:, 0].astype(str)
 
     # 은행업 XBRL에서 자주 쓰는 라벨/컨셉 id
-    idx_operating = find_row_index(concept, r"ProfitLossFromOperatingActivities")   # 영업이익
-    idx_net       = find_row_index(concept, r"^ifrs-full_ProfitLoss$")             # 당기순이익
-    idx_int_rev   = find_row_index(concept, r"ifrs-full_RevenueFromInterest")      # 이자수익
-    idx_ins_rev   = find_row_index(concept, r"ifrs-full_InsuranceRevenue")         # 보험수익
+    concept_index = build_concept_index(concept)
+    idx_operating = lookup_row_index(concept_index, OPERATING_RE)  # 영업이익
+    idx_net       = lookup_row_index(concept_index, NET_RE)        # 당기순이익
+    idx_int_rev   = lookup_row_index(concept_index, INT_REV_RE)    # 이자수익
+    idx_ins_rev   = lookup_row_index(concept_index, INS_REV_RE)    # 보험수익
 
     # '연결재무제표' 열만 사용 (은행은 연결 기준을 더 많이 봄)
     consol_cols = [c for c in df.columns if "연결재무제표" in str(c)]
     if not consol_cols:
         raise RuntimeError("연결재무제표 열을 찾지 못했습니다. CSV 구조를 확인하세요.")
 
-    period_map = {c: extract_period(c) for c in consol_cols}
+    fields = {"operating_profit": idx_operating, "net_income": idx_net,
+              "interest_revenue": idx_int_rev, "insurance_revenue": idx_ins_rev}
+    found = {name: idx for name, idx in fields.items() if idx is not None}
 
-    records = []
-    for col, period in period_map.items():
-        rec = {"period": period}
+    # 필요한 행 × 연결 열만 잘라 한 번에 숫자화 (전치 후 행=기간, 열=지표)
+    tidy = df.loc[list(found.values()), consol_cols].T
+    tidy.columns = list(found)
+    tidy = tidy.apply(pd.to_numeric, errors="coerce").reindex(columns=list(fields))
 
-        def safe_get(idx):
-            if idx is None:
-                return np.nan
-            return pd.to_numeric(df.loc[idx, col], errors="coerce")
+    # 헤더에서 기간만 추출 (매칭 실패 시 헤더 문자열 그대로)
+    headers = pd.Series([str(c) for c in consol_cols], index=tidy.index)
+    m = headers.str.extract(PERIOD_RE)
+    tidy.insert(0, "period", (m[0] + "-" + m[1]).fillna(m[0]).fillna(headers))
 
-        rec["operating_profit"]  = safe_get(idx_operating)
-        rec["net_income"]        = safe_get(idx_net)
-        rec["interest_revenue"]  = safe_get(idx_int_rev)
-        rec["insurance_revenue"] = safe_get(idx_ins_rev)
+    # (단순 프록시) 총수익 ~ 이자수익 + 보험수익 (둘 다 결측이면 0)
+    tidy["revenue_proxy"] = tidy[["interest_revenue", "insurance_revenue"]].sum(axis=1)
 
-        # (단순 프록시) 총수익 ~ 이자수익 + 보험수익
-        rec["revenue_proxy"] = np.nansum([rec["interest_revenue"], rec["insurance_revenue"]])
-
-        if not np.isnan(rec["revenue_proxy"]) and rec["revenue_proxy"] != 0:
-            rec["operating_margin_pct"] = (rec["operating_profit"] / rec["revenue_proxy"]) * 100
-            rec["net_margin_pct"]       = (rec["net_income"]     / rec["revenue_proxy"]) * 100
-        else:
-            rec["operating_margin_pct"] = np.nan
-            rec["net_margin_pct"]       = np.nan
+    revenue = tidy["revenue_proxy"].replace(0, np.nan)
+    tidy["operating_margin_pct"] = tidy["operating_profit"] / revenue * 100
+    tidy["net_margin_pct"]       = tidy["net_income"] / revenue * 100
 
-        records.append(rec)
+    tidy = tidy.sort_values("period").reset_index(drop=True)
 
-    tidy = pd.DataFrame(records).sort_values("period").reset_index(drop=True)
-
-    # 전기 대비 변화율(%)
-    for col in ["operating_profit", "net_income", "revenue_proxy",
-                "operating_margin_pct", "net_margin_pct"]:
-        tidy[f"{col}_chg_pct"] = tidy[col].pct_change() * 100
+    # 전기 대비 변화율(%): 다섯 지표를 한 번에 계산해 한 번에 붙임
+    chg_cols = ["operating_profit", "net_income", "revenue_proxy",
+                "operating_margin_pct", "net_margin_pct"]
+    chg = tidy[chg_cols].pct_change().mul(100).add_suffix("_chg_pct")
+    tidy = pd.concat([tidy, chg], axis=1)
 
     return tidy
 
+_tidy_memo = {}
+
+def _tidy_cache_key(csv_path: Path) -> tuple:
+    """(입력 파일 id, 내용 key). 입력 파일 id는 경로만, key는 버전+경로+수정시각+크기로 만듦"""
+    src = str(csv_path.resolve())
+    st = csv_path.stat()
+    raw = f"{TIDY_CACHE_VERSION}|{src}|{st.st_mtime_ns}|{st.st_size}"
+    src_id = hashlib.blake2b(src.encode("utf-8"), digest_size=8).hexdigest()
+    return src_id, hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def _prune_tidy_cache(cache_dir: Path, out_dir: Path, src_id: str, keep: Path) -> None:
+    """같은 입력 파일의 예전 캐시, 출력 폴더의 예전 형식 캐시, 개수 초과분(오래된 순)을 지움"""
+    stale = [p for p in cache_dir.glob(f"tidy_{src_id}_*.pkl") if p != keep]
+    stale += [p for p in out_dir.glob("tidy_*.pkl") if LEGACY_TIDY_CACHE_RE.fullmatch(p.name)]
+    rest = sorted((p for p in cache_dir.glob("tidy_*.pkl") if p != keep and p not in stale),
+                  key=lambda p: p.stat().st_mtime, reverse=True)
+    stale += rest[TIDY_CACHE_MAX_FILES - 1:]
+    for p in stale:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+
+def load_and_tidy_cached(csv_path: Path, out_dir: Path) -> pd.DataFrame:
+    """입력 CSV(경로+수정시각+크기)가 그대로면 이전 정규화 결과 재사용 (프로세스 내 메모리 → out_dir/.tidy_cache 디스크 순)"""
+    src_id, key = _tidy_cache_key(csv_path)
+    tidy = _tidy_memo.get(key)
+    if tidy is None:
+        cache_dir = out_dir / TIDY_CACHE_DIRNAME
+        cache_path = cache_dir / f"tidy_{src_id}_{key}.pkl"
+        if cache_path.exists():
+            tidy = pd.read_pickle(cache_path)
+        else:
+            tidy = load_and_tidy(csv_path)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tidy.to_pickle(cache_path)
+            _prune_tidy_cache(cache_dir, out_dir, src_id, cache_path)
+        _tidy_memo[key] = tidy
+    return tidy.copy()
+
 def build_simple_insights(tidy: pd.DataFrame) -> str:
     def pct(x):
         return "NA" if pd.isna(x) else f"{x:+.2f}%"
@@ -122,12 +214,12 @@ def build_simple_insights(tidy: pd.DataFrame) -> str:
 
 def run(csv_path: Path, out_dir: Path):
     out_dir.mkdir(parents=True, exist_ok=True)
-    tidy = load_and_tidy(csv_path)
+    tidy = load_and_tidy_cached(csv_path, out_dir)
 
     tidy_path = out_dir / "financial_auto_tidy.csv"
     report_path = out_dir / "financial_auto_report.md"
 
-    tidy.to_csv(tidy_path, index=False, encoding="utf-8-sig")
+    dm.write_csv(tidy, tidy_path)
     report = build_simple_insights(tidy)
     report_path.write_text(report, encoding="utf-8")
 
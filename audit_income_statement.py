@@ -1,36 +1,40 @@
 # filename: audit_income_statement.py
-import argparse, os, re, sys
+import argparse, functools, os, re, sys
 import pandas as pd
 
 def _read_csv(path):
+    # utf-8-sig로 바로 파싱, 디코딩 오류일 때만 다음 인코딩으로
     for enc in ("utf-8-sig","cp949"):
         try:
             return pd.read_csv(path, encoding=enc)
-        except Exception:
-            pass
+        except UnicodeDecodeError:
+            continue
     return pd.read_csv(path, encoding_errors="ignore", engine="python")
 
+# 괄호/구두점 삭제 테이블 (re.sub 연쇄 대신 str.translate 한 번)
+_NORM_DEL = str.maketrans("", "", "()[]{}·,./\\-_%:;|")
+_WS_RE = re.compile(r"\s+")
+_NUM_JUNK_RE = re.compile(r"[^0-9.\-+]")
+
 def _norm(s: str) -> str:
     if s is None: return ""
-    s = str(s)
-    s = re.sub(r"[()\[\]{}]", "", s)
-    s = re.sub(r"\s+", "", s)
-    s = re.sub(r"[·,./\\\-_%:;|]", "", s)
+    s = str(s).translate(_NORM_DEL)
+    s = _WS_RE.sub("", s)
     return s.lower()
 
-def _to_number(x):
-    if pd.isna(x): return pd.NA
-    s = str(x).strip()
-    if s in {"","-","nan","none","null"}: return pd.NA
-    neg = s.startswith("(") and s.endswith(")")
-    if neg: s = s[1:-1]
-    s = s.replace(",", "")
-    s = re.sub(r"[^0-9.\-+]", "", s)
-    if s in {"","-","+",".","-.","+."}: return pd.NA
-    try:
-        v = float(s) if "." in s else int(s)
-        return -v if neg else v
-    except: return pd.NA
+def _norm_series(s: pd.Series) -> pd.Series:
+    """_norm의 열 단위 버전 (string dtype .str 연산, 결측은 결측 유지)"""
+    s = s.astype("string").str.translate(_NORM_DEL)
+    return s.str.replace(_WS_RE, "", regex=True).str.lower()
+
+def _to_number_series(s: pd.Series) -> pd.Series:
+    """문자 금액 열 → 실수(Float64) (괄호음수/쉼표/단위문자 처리, 셀 단위 파이썬 호출 없이 벡터화)"""
+    s = s.astype("string").str.strip()
+    neg = s.str.startswith("(") & s.str.endswith(")")
+    s = s.where(~neg, s.str[1:-1])
+    s = s.str.replace(",", "", regex=False).str.replace(_NUM_JUNK_RE, "", regex=True)
+    v = pd.to_numeric(s, errors="coerce").astype("Float64")  # 정수 문자열만 있어도 Int64가 아닌 실수로
+    return v.mask(neg.fillna(False), -v)
 
 # 핵심 계정 후보(라벨 + IFRS ID)
 DENOM_KO = ["매출액","영업수익","수익","수익합계","총수익","영업수익합계","영업수익(수익)"]
@@ -44,6 +48,10 @@ NET_KO = ["당기순이익","당기순이익손실","지배주주순이익","지
 NET_ID = ["ifrs-full_profitloss","ifrs_profitloss","ifrsfull_profitloss",
           "profitloss","profitlossattributabletoownersofparent"]
 
+# 계정명/IFRS ID 열 후보 (audit 호출마다 리스트를 새로 만들지 않도록 모듈 상수)
+NAME_COL_HINTS = ("account_nm","account_name","account","계정","계정과목","ifrs_account_name","account_detail")
+ID_COL_HINTS = ("account_id","ifrs_account_id","taxonomy","element_id")
+
 # 기간 금액 컬럼 후보
 PERIOD_SETS = [
     dict(labels=["thstrm_nm","frmtrm_nm","bfefrm_nm"],
@@ -66,11 +74,22 @@ def find_col_by_hint(df, hints):
                 return orig
     return None
 
+@functools.lru_cache(maxsize=None)
+def _token_pattern(tokens: tuple):
+    """후보 토큰 목록 → 부분일치 alternation 정규식 1개"""
+    return re.compile("|".join(re.escape(t) for t in tokens))
+
+NORM_COLS = ["_nm_norm", "_id_norm"]
+
+def add_norm_cols(df, name_col, id_col):
+    """계정명/IFRS ID 정규화 열을 df에 1회 추가 (match_row 들이 공유)"""
+    df["_nm_norm"] = _norm_series(df[name_col]) if name_col else ""
+    df["_id_norm"] = _norm_series(df[id_col]) if id_col else ""
+
 def match_row(df, name_col, id_col, ko_list, id_list, prefer_owner=False):
-    df["_nm_norm"] = df[name_col].astype(str).map(_norm) if name_col else ""
-    df["_id_norm"] = df[id_col].astype(str).map(_norm) if id_col else ""
-    by_id = df[df["_id_norm"].apply(lambda s: any(t in s for t in id_list))] if id_col else pd.DataFrame()
-    by_nm = df[df["_nm_norm"].apply(lambda s: any(t in s for t in ko_list))] if name_col else pd.DataFrame()
+    """df에는 add_norm_cols로 만든 정규화 열이 있어야 함 (df는 변경하지 않음)"""
+    by_id = df[df["_id_norm"].str.contains(_token_pattern(tuple(id_list)), na=False)] if id_col else pd.DataFrame()
+    by_nm = df[df["_nm_norm"].str.contains(_token_pattern(tuple(ko_list)), na=False)] if name_col else pd.DataFrame()
     cand = by_id if not by_id.empty else by_nm
     if cand.empty: return None
     if prefer_owner:
@@ -83,14 +102,14 @@ def audit(path, debug=False):
 
     # 구조 파악: 세로형(계정행)인지 확인
     name_col = None
-    for cand in ["account_nm","account_name","account","계정","계정과목","ifrs_account_name","account_detail"]:
+    for cand in NAME_COL_HINTS:
         if cand in df.columns: name_col = cand; break
         for c in df.columns:
             if _norm(cand) in _norm(c): name_col = c; break
         if name_col: break
 
     id_col = None
-    for cand in ["account_id","ifrs_account_id","taxonomy","element_id"]:
+    for cand in ID_COL_HINTS:
         if cand in df.columns: id_col = cand; break
         for c in df.columns:
             if _norm(cand) in _norm(c): id_col = c; break
@@ -125,9 +144,10 @@ def audit(path, debug=False):
     # 핵심 계정 존재 확인
     denom_row = op_row = net_row = None
     if ok:
-        denom_row = match_row(df.copy(), name_col, id_col, DENOM_KO, DENOM_ID, prefer_owner=False)
-        op_row    = match_row(df.copy(), name_col, id_col, OP_KO, OP_ID, prefer_owner=False)
-        net_row   = match_row(df.copy(), name_col, id_col, NET_KO, NET_ID, prefer_owner=True)
+        add_norm_cols(df, name_col, id_col)
+        denom_row = match_row(df, name_col, id_col, DENOM_KO, DENOM_ID, prefer_owner=False)
+        op_row    = match_row(df, name_col, id_col, OP_KO, OP_ID, prefer_owner=False)
+        net_row   = match_row(df, name_col, id_col, NET_KO, NET_ID, prefer_owner=True)
 
         if denom_row is None:
             ok = False; notes.append("분모(매출액/영업수익/수익) 계정을 찾지 못했습니다.")
@@ -140,7 +160,7 @@ def audit(path, debug=False):
     if ok and chosen:
         amt_cols = chosen["amts"]
         # 숫자화
-        for c in amt_cols: df[c] = df[c].apply(_to_number)
+        for c in amt_cols: df[c] = _to_number_series(df[c])
 
         def has_any_value(row):
             return any(pd.notna(row[c]) for c in amt_cols)
@@ -192,6 +212,7 @@ def audit(path, debug=False):
 
     # 디버그 모드: 컬럼/샘플 미리보기
     if debug:
+        df = df.drop(columns=NORM_COLS, errors="ignore")
         print("\n[DEBUG] columns:", list(df.columns)[:60])
         print("\n[DEBUG] head(8):")
         print(df.head(8).to_string(index=False))
@@ -1,36 +1,47 @@
-import argparse, os, re, sys
+import argparse, functools, io, os, re, sys
+import numpy as np
 import pandas as pd
 
 # ============== utils ==============
 def read_csv(path):
+    # 파일은 한 번만 읽고, 디코딩되는 인코딩으로 한 번만 파싱
+    with open(path, "rb") as f:
+        raw = f.read()
     for enc in ("utf-8-sig","cp949"):
         try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception:
-            pass
-    return pd.read_csv(path, encoding_errors="ignore", engine="python")
-
-def to_number(x):
-    if pd.isna(x): return pd.NA
-    s = str(x).strip()
-    if s in {"","-","nan","none","null"}: return pd.NA
-    neg = s.startswith("(") and s.endswith(")")
-    if neg: s = s[1:-1]
-    s = s.replace(",", "")
-    s = re.sub(r"[^0-9.\-+]", "", s)
-    if s in {"","-","+",".","-.","+."}: return pd.NA
-    try:
-        v = float(s)
-        return -v if neg else v
-    except:
-        return pd.NA
+            raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+        return pd.read_csv(io.BytesIO(raw), encoding=enc)
+    return pd.read_csv(io.BytesIO(raw), encoding_errors="ignore", engine="python")
+
+NUM_JUNK_RE = re.compile(r"[^0-9.\-+]")
+
+def to_number_series(s: pd.Series) -> pd.Series:
+    """괄호음수/쉼표/단위문자 처리 후 숫자화 (열 전체를 pandas 문자열 연산으로 한 번에)"""
+    s = s.astype("string").str.strip()
+    neg = (s.str.startswith("(") & s.str.endswith(")")).fillna(False)
+    s = s.where(~neg, s.str.slice(1, -1))
+    s = s.str.replace(",", "", regex=False).str.replace(NUM_JUNK_RE, "", regex=True)
+    out = pd.to_numeric(s, errors="coerce").astype("Float64")
+    return out.where(~neg, -out)
+
+NORM_BRACKETS_RE = re.compile(r"[()\[\]{}]")
+NORM_SPACE_RE    = re.compile(r"\s+")
+NORM_PUNCT_RE    = re.compile(r"[·,./\\\-_%:;|']")
 
 def norm(s: str) -> str:
-    s = re.sub(r"[()\[\]{}]", "", str(s))
-    s = re.sub(r"\s+", "", s)
-    s = re.sub(r"[·,./\\\-_%:;|']", "", s)
+    s = NORM_BRACKETS_RE.sub("", str(s))
+    s = NORM_SPACE_RE.sub("", s)
+    s = NORM_PUNCT_RE.sub("", s)
     return s.lower()
 
+def norm_series(s: pd.Series) -> pd.Series:
+    """열 정규화: 고유값에만 norm 적용 후 categorical로 (concept id/라벨은 중복이 많음)"""
+    raw = s.astype(str).astype("category")
+    codes, cats = pd.factorize(raw.cat.categories.map(norm))
+    return pd.Series(pd.Categorical.from_codes(codes[raw.cat.codes.to_numpy()], cats), index=s.index)
+
 # 항상 스칼라만 반환하도록 보정
 def cell(row: pd.Series, col_label):
     try:
@@ -89,23 +100,46 @@ def find_concept_and_label_cols(df):
     return concept_id_col, label_col
 
 # ============== pickers ==============
-def pick_row_exact_name(df, label_col, names_exact):
-    if not label_col:
+# nlabel/nid: compute()에서 한 번만 만든 정규화 열 (열이 없으면 None)
+def pick_row_exact_name(df, nlabel, names_exact):
+    if nlabel is None:
         return None
-    nlabel = df[label_col].astype(str).map(norm)
     mask = nlabel.isin([norm(x) for x in names_exact])  # 정확일치만
     cand = df[mask]
     if cand.empty: return None
     return cand.iloc[0]
 
-def pick_row_by_id(df, concept_id_col, id_list):
-    if not concept_id_col:
+ID_NAMESPACE_RE = re.compile(r"[-_]")
+
+@functools.lru_cache(maxsize=None)
+def id_matcher(id_list: tuple):
+    """
+    id 목록 → [(정확일치 여부, norm 적용 id), ...] (목록 순서 유지, 목록별 1회 생성).
+    네임스페이스가 붙은 id('ifrs-full_...', 'dart_...')는 완전한 concept id라 정확일치,
+    접두어 없는 조각('profitloss' 등)만 부분일치 (ifrsfullrevenue가 ...revenuefrominterest에 걸리지 않도록)
+    """
+    return tuple((bool(ID_NAMESPACE_RE.search(k)), norm(k)) for k in id_list)
+
+def pick_row_by_id(df, nid, id_list):
+    if nid is None or not id_list:
         return None
-    nid = df[concept_id_col].astype(str).map(norm)
-    mask = nid.apply(lambda s: any(k in s for k in id_list))
-    cand = df[mask]
-    if cand.empty: return None
-    return cand.iloc[0]
+    # 고유 concept id(categories)에서만 판정 후 codes로 행에 펼침.
+    # 목록 앞쪽 id 우선: 'profitloss' 조각이 ...FromOperatingActivities 등에 먼저 걸리지 않도록
+    # 앞선 id가 하나라도 맞으면 뒤쪽 id는 보지 않음
+    cats = nid.cat.categories
+    codes = nid.cat.codes.to_numpy()
+    for is_exact, key in id_matcher(tuple(id_list)):
+        hit = cats.isin([key]) if is_exact else np.asarray(cats.str.contains(key, regex=False), dtype=bool)
+        if hit.any():
+            return df[hit[codes]].iloc[0]
+    return None
+
+def first_row(*rows):
+    """앞에서부터 처음 찾은 행 (Series는 `or`로 고를 수 없음)"""
+    for r in rows:
+        if r is not None:
+            return r
+    return None
 
 def pct(n, d):
     try:
@@ -148,44 +182,45 @@ def compute(path, net_kind="owner"):
     if not pcols:
         # 숫자열 폴백
         num_cols = [c for c in df.columns
-                    if pd.api.types.is_numeric_dtype(df[c]) or df[c].apply(lambda v: to_number(v) is not pd.NA).any()]
+                    if pd.api.types.is_numeric_dtype(df[c]) or to_number_series(df[c]).notna().any()]
         if not num_cols:
             raise RuntimeError("기간/재무제표 열을 찾지 못했습니다.")
         pcols = [(c, "", str(c), "") for c in num_cols]
 
-    # 숫자화
-    for col, *_ in pcols:
-        df[col] = df[col].apply(to_number)
+    # 숫자화 (기간 열 전체를 한 번에 변환해 한 블록으로 되돌려 씀)
+    num_cols = list(dict.fromkeys(col for col, *_ in pcols))
+    df[num_cols] = df[num_cols].apply(to_number_series)
 
     concept_id_col, label_col = find_concept_and_label_cols(df)
     if concept_id_col is None and label_col is None:
         raise RuntimeError("concept_id/label 열을 찾지 못했습니다.")
+    nid    = norm_series(df[concept_id_col]) if concept_id_col else None
+    nlabel = norm_series(df[label_col]) if label_col else None
 
     # 영업이익
-    op_row = pick_row_by_id(df, concept_id_col, OP_PROFIT_IDS) or pick_row_exact_name(df, label_col, OP_PROFIT_NAME)
+    op_row = first_row(pick_row_by_id(df, nid, OP_PROFIT_IDS), pick_row_exact_name(df, nlabel, OP_PROFIT_NAME))
 
     # 순이익 기준
     if net_kind == "owner":
-        ni_row = pick_row_by_id(df, concept_id_col, NI_OWNER_IDS) or pick_row_exact_name(df, label_col, NI_OWNER_NAME)
+        ni_row = first_row(pick_row_by_id(df, nid, NI_OWNER_IDS), pick_row_exact_name(df, nlabel, NI_OWNER_NAME))
         ni_kind = "owner"
         if ni_row is None:
-            ni_row = pick_row_by_id(df, concept_id_col, NI_TOTAL_IDS) or pick_row_exact_name(df, label_col, NI_TOTAL_NAME)
+            ni_row = first_row(pick_row_by_id(df, nid, NI_TOTAL_IDS), pick_row_exact_name(df, nlabel, NI_TOTAL_NAME))
             ni_kind = "total(fallback)"
     else:
-        ni_row = pick_row_by_id(df, concept_id_col, NI_TOTAL_IDS) or pick_row_exact_name(df, label_col, NI_TOTAL_NAME)
+        ni_row = first_row(pick_row_by_id(df, nid, NI_TOTAL_IDS), pick_row_exact_name(df, nlabel, NI_TOTAL_NAME))
         ni_kind = "total"
         if ni_row is None:
-            ni_row = pick_row_by_id(df, concept_id_col, NI_OWNER_IDS) or pick_row_exact_name(df, label_col, NI_OWNER_NAME)
+            ni_row = first_row(pick_row_by_id(df, nid, NI_OWNER_IDS), pick_row_exact_name(df, nlabel, NI_OWNER_NAME))
             ni_kind = "owner(fallback)"
 
     # 총수익(명시적) → 없으면 대체합
-    total_rev_row = pick_row_exact_name(df, label_col, TOTAL_REV_NAMES) \
-                    or pick_row_by_id(df, concept_id_col, TOTAL_REV_IDS)
+    total_rev_row = first_row(pick_row_exact_name(df, nlabel, TOTAL_REV_NAMES), pick_row_by_id(df, nid, TOTAL_REV_IDS))
 
     # 대체 구성요소
-    interest_row = pick_row_by_id(df, concept_id_col, INTEREST_INCOME_IDS) or pick_row_exact_name(df, label_col, INTEREST_INCOME_NAME)
-    fee_row      = pick_row_by_id(df, concept_id_col, FEE_INCOME_IDS)      or pick_row_exact_name(df, label_col, FEE_INCOME_NAME)
-    ins_row      = pick_row_by_id(df, concept_id_col, INSURANCE_INCOME_IDS)or pick_row_exact_name(df, label_col, INSURANCE_INCOME_NAME)
+    interest_row = first_row(pick_row_by_id(df, nid, INTEREST_INCOME_IDS), pick_row_exact_name(df, nlabel, INTEREST_INCOME_NAME))
+    fee_row      = first_row(pick_row_by_id(df, nid, FEE_INCOME_IDS), pick_row_exact_name(df, nlabel, FEE_INCOME_NAME))
+    ins_row      = first_row(pick_row_by_id(df, nid, INSURANCE_INCOME_IDS), pick_row_exact_name(df, nlabel, INSURANCE_INCOME_NAME))
 
     rows = []
     for col, start, end, fs in pcols:
@@ -220,7 +255,9 @@ def compute(path, net_kind="owner"):
             net_basis=ni_kind
         ))
 
-    out = pd.DataFrame(rows).sort_values("period_end", ascending=False).reset_index(drop=True)
+    # 기간 수가 적으니 DataFrame 정렬/인덱스 재구성 대신 리스트를 먼저 정렬
+    rows.sort(key=lambda r: r["period_end"], reverse=True)
+    out = pd.DataFrame(rows)
     return out
 
 # ============== cli ==============
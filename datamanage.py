@@ -1,9 +1,24 @@
 import pandas as pd
 import re
 import numpy as np
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# ----- 저장 -----
+WRITE_BUFFER = 1 << 20  # 1 MiB 쓰기 버퍼 (기본 8 KiB보다 write 시스템콜 수가 적음)
+
+def write_csv(df: pd.DataFrame, path, drop_empty_cols: bool = False) -> None:
+    """utf-8-sig(BOM) CSV 저장 (큰 쓰기 버퍼로 to_csv)
+    drop_empty_cols=True: 값이 전부 NaN/빈 문자열인 열은 빼고 저장 (XBRL 표는 빈 열이 많음)"""
+    if drop_empty_cols:
+        empty = (df.isna() | df.eq("")).all(axis=0).to_numpy()
+        if empty.any():
+            df = df.loc[:, ~empty]
+    with open(path, "w", encoding="utf-8-sig", newline="", buffering=WRITE_BUFFER) as f:
+        df.to_csv(f, index=False)
 
 # ----- 컬럼/텍스트 전처리 -----
 CLASS_PATTERNS = [r"(?i)\bclass\s*1\b", r"(?i)\bclass\s*2\b", r"(?i)\bclass\s*3\b"]
+CLASS_RES = [re.compile(p) for p in CLASS_PATTERNS]
 ALT_NAME_CANDIDATES = ["account_name", "항목", "과목명"]
 
 def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
@@ -11,62 +26,82 @@ def _normalize_cols(df: pd.DataFrame) -> pd.DataFrame:
     out.columns = [(" ".join(map(str, c)) if isinstance(c, tuple) else str(c)) for c in out.columns]
     return out
 
-def _find_first_col(df: pd.DataFrame, pattern: str):
+def _find_first_col(df: pd.DataFrame, pattern):
+    rx = re.compile(pattern)  # 이미 컴파일된 패턴이면 그대로 반환됨
     for c in df.columns:
-        if re.search(pattern, str(c)):
+        if rx.search(str(c)):
             return c
     return None
 
-def build_path_text(row: pd.Series, c1, c2, c3) -> str:
-    parts = []
+def build_path_text_series(df: pd.DataFrame, c1, c2, c3) -> pd.Series:
+    """class1 > class2 > class3 경로를 열끼리 이어 붙임 (행별 apply 없음), 경로가 비면 대체 이름 열 값"""
+    out = pd.Series("", index=df.index, dtype=object)
+    has_part = pd.Series(False, index=df.index)
     for c in [c1, c2, c3]:
-        if c and c in row and str(row[c]).strip() not in ["", "nan", "None"]:
-            parts.append(str(row[c]))
-    if parts:
-        return " > ".join(parts)
+        if not c or c not in df.columns:
+            continue
+        txt = df[c].astype(str)
+        keep = ~txt.str.strip().isin(["", "nan", "None"])
+        out = ((out + " > ").where(has_part, "") + txt).where(keep, out)
+        has_part |= keep
+    # 경로가 비면 대체 이름 열 중 첫 번째 값 사용
     for cand in ALT_NAME_CANDIDATES:
-        if cand in row and str(row[cand]).strip():
-            return str(row[cand])
-    return ""
+        if cand not in df.columns:
+            continue
+        txt = df[cand].astype(str)
+        use = ~has_part & txt.str.strip().ne("")
+        out = txt.where(use, out)
+        has_part |= use
+    return out
 
 # ----- 라벨링(룰) -----
-REV_KW = r"(수익|이익|환입|매출)"
-EXP_KW = r"(비용|손실|전입|충당금|감가상각|손상|상각)"
-NET_KW = r"(손익|결과|영업이익|영업손익|포괄손익)"
-
-def rule_label(text: str) -> str:
-    s = (text or "").replace(" ", "")
-    if not s: return "HEADER"
-    if re.search(NET_KW, s): return "NET"
-    if re.search(REV_KW, s): return "REVENUE"
-    if re.search(EXP_KW, s): return "EXPENSE"
-    return "OTHER"
+REV_KW = r"(?:수익|이익|환입|매출)"
+EXP_KW = r"(?:비용|손실|전입|충당금|감가상각|손상|상각)"
+NET_KW = r"(?:손익|결과|영업이익|영업손익|포괄손익)"
+REV_RE = re.compile(REV_KW)
+EXP_RE = re.compile(EXP_KW)
+NET_RE = re.compile(NET_KW)
+
+def rule_label_series(names: pd.Series) -> pd.Series:
+    """계정명 → 룰 라벨 (공백 제거 후 우선순위 HEADER > NET > REVENUE > EXPENSE > OTHER를 np.select로)"""
+    s = names.fillna("").astype(str).str.replace(" ", "", regex=False)
+    conds = [s.eq(""),
+             s.str.contains(NET_RE, na=False),
+             s.str.contains(REV_RE, na=False),
+             s.str.contains(EXP_RE, na=False)]
+    labels = np.select(conds, ["HEADER", "NET", "REVENUE", "EXPENSE"], default="OTHER")
+    return pd.Series(labels, index=names.index, dtype=object)
 
 # ----- 값 컬럼 선택: '별도/개별 재무제표' 제외, '연결재무제표' 우선 -----
 EXCLUDE_VALUE_COLS_RE = re.compile(r"(?i)(증감|증가|감소|전년|전년도|전기|누계|비율|율|%|단위|notes?|comment|주석|코드|계정|항목)")
 CLASS_RE = re.compile(r"(?i)\bclass\s*\d+\b")
-
-def _to_num(x):
-    if pd.isna(x): return np.nan
-    s = str(x).strip().replace(",", "")
-    if re.fullmatch(r"\(.*\)", s):  # (123) -> -123
-        s = "-" + s[1:-1]
-    try:
-        return float(s)
-    except:
-        return np.nan
+CLASS3_RE = re.compile(r"(?i)\bclass\s*3\b")
+PAREN_NUM_RE = re.compile(r"\(\s*[\d.,]+\s*\)")  # 괄호 음수 (123) - (주) 같은 글자는 제외
+VALUE_COL_SAMPLE_ROWS = 200  # 값 컬럼 판정은 앞쪽 표본 행만 보고 결정
+
+def _to_num_series(s: pd.Series) -> pd.Series:
+    """값 열 → float (쉼표 제거, (123) → -123, 변환 불가는 NaN). 문자열 연산 + pd.to_numeric 한 번으로 변환"""
+    if is_numeric_dtype(s) and not is_bool_dtype(s):
+        return s.astype(float)
+    t = s.astype("string").str.strip().str.replace(",", "", regex=False)
+    neg = t.str.fullmatch(PAREN_NUM_RE).fillna(False).astype(bool)  # (123) -> -123
+    t = t.where(~neg, "-" + t.str[1:-1].str.strip())
+    v = pd.to_numeric(t, errors="coerce")
+    return pd.Series(v.to_numpy(dtype=float, na_value=np.nan), index=s.index, name=s.name)
 
 def pick_value_cols(df: pd.DataFrame,
                     prefer_col_regex: str = r"연결\s*재무제표",
                     exclude_col_regex: str = r"(별도\s*재무제표|개별\s*재무제표)") -> list:
+    exclude_re = re.compile(exclude_col_regex, flags=re.IGNORECASE) if exclude_col_regex else None
     candidates = []
+    sample = df.head(VALUE_COL_SAMPLE_ROWS)
     for c in df.columns:
         if CLASS_RE.search(str(c)): continue
         if EXCLUDE_VALUE_COLS_RE.search(str(c)): continue
         if str(c) in ["__name__","pred_label"]: continue
-        if exclude_col_regex and re.search(exclude_col_regex, str(c), flags=re.IGNORECASE):
+        if exclude_re and exclude_re.search(str(c)):
             continue
-        ser = df[c].apply(_to_num)
+        ser = _to_num_series(sample[c])
         if ser.notna().mean() > 0.3:  # 값 비율 기준
             candidates.append(c)
     # 연결 우선 정렬
@@ -76,40 +111,58 @@ def pick_value_cols(df: pd.DataFrame,
     return candidates
 
 # ----- 지표 집계(은행) -----
-def sum_by_mask(df_vals: pd.DataFrame, mask: pd.Series) -> pd.Series:
-    if mask.sum() == 0:
-        return pd.Series({c: np.nan for c in df_vals.columns})
-    return df_vals.loc[mask].sum(numeric_only=True)
+NII_RE  = re.compile(r"(?:순이자손익|이자손익|이자이익)")
+FEE_RE  = re.compile(r"(?:순수수료손익|수수료손익)")
+INS_RE  = re.compile(r"(?:보험서비스결과|보험서비스손익|보험손익)")
+PROV_RE = re.compile(r"(?:대손충당금|신용손실충당금|대손비용|충당금전입)")
+OPX_RE  = re.compile(r"(?:일반관리비|판매관리비|영업비용|영업경비|직원비용|인건비|감가상각비|임차료|마케팅|광고)")
+NI_RE   = re.compile(r"(?:당기순이익|순이익|지배기업.*순이익|연결당기순이익)")
+OTH_RE  = re.compile(r"(?:유가증권|파생|외환|금융상품|평가|배당|기타(?:영업)?수익|기타손익)")
+
+def sum_by_masks(df_vals: pd.DataFrame, masks: dict) -> dict:
+    """마스크별 값열 합계를 (마스크 × 행) @ (행 × 값열) 행렬곱 한 번으로 (해당 행이 없으면 NaN)"""
+    B = np.vstack([np.asarray(m, dtype=bool) for m in masks.values()])
+    A = df_vals.fillna(0).to_numpy(dtype=np.float64)
+    if np.isinf(A).any():
+        # 행렬곱에선 0*inf=NaN이 모든 마스크 합계로 번지므로, inf가 있으면 마스크별로 해당 행만 합산
+        R = np.vstack([A[b].sum(axis=0) for b in B])
+    else:
+        R = B.astype(np.float64) @ A
+    return {k: pd.Series(r if n else np.nan, index=df_vals.columns)
+            for k, r, n in zip(masks, R, B.sum(axis=1))}
 
 def compute_metrics_bank(df_l: pd.DataFrame, value_cols: list) -> dict:
     D = df_l.copy()
-    V = D[value_cols].applymap(_to_num)
+    V = pd.DataFrame({c: _to_num_series(D[c]) for c in value_cols}, index=D.index, columns=value_cols)
     name = D["__name__"].fillna("")
 
     # 핵심 항목 키워드(확장)
-    nii_mask  = D["pred_label"].eq("NET") & name.str.contains(r"(순이자손익|이자손익|이자이익)")
-    fee_mask  = D["pred_label"].eq("NET") & name.str.contains(r"(순수수료손익|수수료손익)")
-    ins_mask  = D["pred_label"].eq("NET") & name.str.contains(r"(보험서비스결과|보험서비스손익|보험손익)")
-    prov_mask = D["pred_label"].eq("EXPENSE") & name.str.contains(r"(대손충당금|신용손실충당금|대손비용|충당금전입)")
-    opx_mask  = D["pred_label"].eq("EXPENSE") & name.str.contains(r"(일반관리비|판매관리비|영업비용|영업경비|직원비용|인건비|감가상각비|임차료|마케팅|광고)")
-    ni_mask   = D["pred_label"].eq("NET") & name.str.contains(r"(당기순이익|순이익|지배기업.*순이익|연결당기순이익)")
-
+    nii_mask  = D["pred_label"].eq("NET") & name.str.contains(NII_RE)
+    fee_mask  = D["pred_label"].eq("NET") & name.str.contains(FEE_RE)
+    ins_mask  = D["pred_label"].eq("NET") & name.str.contains(INS_RE)
+    prov_mask = D["pred_label"].eq("EXPENSE") & name.str.contains(PROV_RE)
+    opx_mask  = D["pred_label"].eq("EXPENSE") & name.str.contains(OPX_RE)
+    ni_mask   = D["pred_label"].eq("NET") & name.str.contains(NI_RE)
+
+    oth_mask  = (D["pred_label"].isin(["REVENUE","NET"]) &
+                 name.str.contains(OTH_RE) &
+                 ~fee_mask & ~ins_mask & ~nii_mask)
+
+    # 일곱 항목 합계를 행렬곱 한 번으로
+    sums = sum_by_masks(V, {
+        "NetInterestIncome": nii_mask, "NetFeeIncome": fee_mask,
+        "InsuranceServiceResult": ins_mask, "OtherNonInterestIncome": oth_mask,
+        "ProvisionExpense": prov_mask, "OperatingExpense": opx_mask, "NetIncome": ni_mask,
+    })
     metrics = {}
-    metrics["NetInterestIncome"] = sum_by_mask(V, nii_mask)
-    metrics["NetFeeIncome"]      = sum_by_mask(V, fee_mask)
-    metrics["InsuranceServiceResult"] = sum_by_mask(V, ins_mask)
-    metrics["OtherNonInterestIncome"] = sum_by_mask(
-        V,
-        (D["pred_label"].isin(["REVENUE","NET"]) &
-         name.str.contains(r"(유가증권|파생|외환|금융상품|평가|배당|기타(영업)?수익|기타손익)") &
-         ~fee_mask & ~ins_mask & ~nii_mask)
-    )
-    prov = sum_by_mask(V, prov_mask)
-    opex = sum_by_mask(V, opx_mask)
+    metrics["NetInterestIncome"] = sums["NetInterestIncome"]
+    metrics["NetFeeIncome"]      = sums["NetFeeIncome"]
+    metrics["InsuranceServiceResult"] = sums["InsuranceServiceResult"]
+    metrics["OtherNonInterestIncome"] = sums["OtherNonInterestIncome"]
     # 비용은 절댓값으로 정규화
-    metrics["ProvisionExpense"]  = prov.abs()
-    metrics["OperatingExpense"]  = opex.abs()
-    metrics["NetIncome"]         = sum_by_mask(V, ni_mask)
+    metrics["ProvisionExpense"]  = sums["ProvisionExpense"].abs()
+    metrics["OperatingExpense"]  = sums["OperatingExpense"].abs()
+    metrics["NetIncome"]         = sums["NetIncome"]
 
     core_income = (metrics["NetInterestIncome"].fillna(0)
                  + metrics["NetFeeIncome"].fillna(0)
@@ -150,12 +203,12 @@ def analyze_income_statement(df: pd.DataFrame,
         raise ValueError("입력 DataFrame이 비었습니다.")
 
     D = _normalize_cols(df)
-    c1 = _find_first_col(D, CLASS_PATTERNS[0])
-    c2 = _find_first_col(D, CLASS_PATTERNS[1])
-    c3 = _find_first_col(D, CLASS_PATTERNS[2])
+    c1 = _find_first_col(D, CLASS_RES[0])
+    c2 = _find_first_col(D, CLASS_RES[1])
+    c3 = _find_first_col(D, CLASS_RES[2])
 
-    D["__name__"]   = D.apply(lambda r: build_path_text(r, c1, c2, c3), axis=1)
-    D["pred_label"] = D["__name__"].map(rule_label)
+    D["__name__"]   = build_path_text_series(D, c1, c2, c3)
+    D["pred_label"] = rule_label_series(D["__name__"])
 
     value_cols = pick_value_cols(D, prefer_col_regex=prefer_col_regex, exclude_col_regex=exclude_col_regex)
     if not value_cols:
@@ -173,24 +226,19 @@ def analyze_income_statement(df: pd.DataFrame,
     return metrics_df, report, value_cols
 
 def drop_rows_where_class3_filled(df: pd.DataFrame) -> pd.DataFrame:
-    out = df.copy()
-
     # 헤더 문자열 안에 'class 3'가 들어간 열 전부 찾기 (대소문자/공백 무시)
-    c3_cols = [c for c in out.columns if re.search(r'(?i)\bclass\s*3\b', str(c))]
+    c3_cols = [c for c in df.columns if CLASS3_RE.search(str(c))]
     if not c3_cols:
         # 어떤 파일은 class3 자체가 없음 → 그대로 반환
-        return out
+        return df.copy()
 
     # "채워짐" 판정: NaN/빈칸/'---'/'...' 등은 비어있다고 간주
-    def is_filled_series(s: pd.Series) -> pd.Series:
-        s_str = s.astype(str).str.strip()
-        return s.notna() & ~(s_str.eq('') | s_str.str.lower().eq('nan') |
-                             s_str.str.fullmatch(r'-+') | s_str.str.fullmatch(r'\.+'))
+    # class3 열 전체 셀을 한 줄로 펼쳐 문자열 연산을 한 번만 수행
+    vals = df[c3_cols].to_numpy(dtype=object)
+    s_str = pd.Series(vals.ravel()).astype(str).str.strip()
+    empty = (pd.isna(vals.ravel()) | s_str.eq('') | s_str.str.lower().eq('nan') |
+             s_str.str.fullmatch(r'-+|\.+')).to_numpy()
 
     # 여러 개라면 하나라도 채워져 있으면 drop
-    filled_mask = None
-    for col in c3_cols:
-        cur = is_filled_series(out[col])
-        filled_mask = cur if filled_mask is None else (filled_mask | cur)
-
-    return out.loc[~filled_mask].copy()
\ No newline at end of file
+    filled_mask = ~empty.reshape(vals.shape).all(axis=1)
+    return df.loc[~filled_mask]
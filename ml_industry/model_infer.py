@@ -1,5 +1,6 @@
 # C:\workspace\KUAIF3\ml_industry\model_infer.py
 import re
+import functools
 import joblib
 import numpy as np
 import pandas as pd
@@ -17,14 +18,31 @@ _CONF_TH = 0.60
 
 _VEC = None
 _CLF = None
+# 로지스틱 회귀 가중치 (predict_proba의 검증/복사 없이 직접 내적)
+_W = None
+_B = None
+_CLASSES = None
 
 def _load_model():
-    global _VEC, _CLF
+    global _VEC, _CLF, _W, _B, _CLASSES
     if _VEC is None or _CLF is None:
         _VEC = joblib.load(MODEL_DIR / "industry_vectorizer.pkl")
         _CLF = joblib.load(MODEL_DIR / "industry_classifier.pkl")
+        _W = np.ascontiguousarray(_CLF.coef_.T, dtype=np.float32)
+        _B = _CLF.intercept_.astype(np.float32)
+        _CLASSES = _CLF.classes_
 
-def _extract_text_for_infer(df: pd.DataFrame, look_rows: int = 150) -> str:
+try:  # import 시 미리 로드 (모델 파일이 없으면 첫 예측 때 다시 시도)
+    _load_model()
+except Exception:
+    _VEC, _CLF = None, None
+
+def _extract_texts(df: pd.DataFrame, look_rows: int = 150, rule_rows: int = 120):
+    """모델 입력 텍스트와 규칙용 텍스트를 첫 열 한 번 읽어서 함께 만듦"""
+    first = df.iloc[:, 0].head(max(look_rows, rule_rows)).astype(str).tolist()
+    return _extract_text_for_infer(df, look_rows, first), " ".join(first[:rule_rows])
+
+def _extract_text_for_infer(df: pd.DataFrame, look_rows: int = 150, first=None) -> str:
     cols = [df.columns[0]]
     for c in df.columns[1:6]:
         s = str(c).lower()
@@ -33,40 +51,57 @@ def _extract_text_for_infer(df: pd.DataFrame, look_rows: int = 150) -> str:
     cols = list(dict.fromkeys(cols))
     parts = []
     head = min(look_rows, len(df))
-    for c in cols:
-        parts += df[c].astype(str).head(head).tolist()
+    for i, c in enumerate(cols):
+        if i == 0 and first is not None:  # 첫 열은 이미 읽은 값 재사용
+            parts += first[:head]
+        else:
+            parts += df[c].astype(str).head(head).tolist()
     return " | ".join(parts)
 
 def predict_industry_from_df(df: pd.DataFrame):
     """모델 예측 (성공 시: (label_id, label_name, conf), 실패 시 예외 발생)"""
+    return _predict_from_text(_extract_text_for_infer(df))
+
+@functools.lru_cache(maxsize=256)  # 같은 텍스트(재분석)는 벡터화/추론 생략
+def _predict_from_text(text: str):
     _load_model()
-    text = _extract_text_for_infer(df)
     X = _VEC.transform([text])
-    proba = _CLF.predict_proba(X)[0]
-    classes = _CLF.classes_
+    logits = np.asarray(X @ _W).ravel() + _B
+    if logits.size == 1:  # 이진 분류: 양성 클래스 로짓 하나 → 시그모이드
+        p1 = 1.0 / (1.0 + np.exp(-float(logits[0])))
+        proba = np.array([1.0 - p1, p1])
+    else:                 # 다중 분류: 소프트맥스
+        e = np.exp(logits - logits.max())
+        proba = e / e.sum()
     idx = int(np.argmax(proba))
-    label_id = int(classes[idx])
+    label_id = int(_CLASSES[idx])
     conf = float(proba[idx])
     label_name = _LABEL_ID_TO_NAME.get(label_id, "other")
     return label_id, label_name, conf
 
 # ---------- 낮은 신뢰도/실패 시 백업: 규칙 기반 ----------
+_RE_BANK = re.compile(r"RevenueFromInterest|이자수익|InsuranceRevenue|보험수익|FeeAndCommissionIncome|수수료수익", re.I)
+_RE_MFG  = re.compile(r"\bifrs-full_Revenue\b|매출|매출액|GrossProfit|매출총이익|OperatingIncomeLoss|영업이익", re.I)
+
 def rule_based_industry(df: pd.DataFrame) -> str:
-    text = " ".join(df.iloc[:,0].astype(str).head(120).tolist())
-    if re.search(r"RevenueFromInterest|이자수익|InsuranceRevenue|보험수익|FeeAndCommissionIncome|수수료수익", text, re.I):
+    return _rule_industry_from_text(" ".join(df.iloc[:,0].astype(str).head(120).tolist()))
+
+def _rule_industry_from_text(text: str) -> str:
+    if _RE_BANK.search(text):
         return "banking"
-    if re.search(r"\bifrs-full_Revenue\b|매출|매출액|GrossProfit|매출총이익|OperatingIncomeLoss|영업이익", text, re.I):
+    if _RE_MFG.search(text):
         return "manufacturing"
     return "manufacturing"  # 보수적 기본값
 
 def decide_industry(df: pd.DataFrame):
     """ML 우선, 신뢰도 낮으면 규칙 보완."""
+    infer_text, rule_text = _extract_texts(df)
     try:
-        lid, lname, conf = predict_industry_from_df(df)
+        lid, lname, conf = _predict_from_text(infer_text)
         if conf < _CONF_TH or lname == "other":
-            fallback = rule_based_industry(df)
+            fallback = _rule_industry_from_text(rule_text)
             return lname, conf, f"low_conf_fallback:{fallback}"
         return lname, conf, "ml"
     except Exception as e:
-        fb = rule_based_industry(df)
+        fb = _rule_industry_from_text(rule_text)
         return fb, 0.0, f"ml_error_fallback:{e}"
\ No newline at end of file
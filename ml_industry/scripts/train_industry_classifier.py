@@ -3,6 +3,7 @@ import os
 import re
 import glob
 import joblib
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -16,21 +17,26 @@ TRAIN_DIR = BASE_DIR / "train_data"
 MODEL_DIR = BASE_DIR / "models"
 MODEL_DIR.mkdir(exist_ok=True, parents=True)
 
+LABEL_FILE_RE = re.compile(r"_(\d+)\.csv$")  # '_기업은행_1.csv' → 1
+
 def read_csv_flex(path: Path) -> pd.DataFrame:
-    """다양한 인코딩으로 CSV 읽기"""
+    """다양한 인코딩으로 CSV 읽기 (utf-8-sig로 바로 파싱, 디코딩 오류일 때만 cp949로 재시도)"""
     last_err = None
-    for enc in ("utf-8-sig", "cp949", "utf-8"):
+    for enc in ("utf-8-sig", "cp949"):
         try:
             return pd.read_csv(path, encoding=enc)
+        except UnicodeDecodeError as e:
+            last_err = e
         except Exception as e:
             last_err = e
+            break
     raise RuntimeError(f"CSV 읽기 실패: {path} / {last_err}")
 
 def extract_label_from_filename(filename: str):
     """
     예: '_기업은행_1.csv' → 1
     """
-    m = re.search(r"_(\d+)\.csv$", filename)
+    m = LABEL_FILE_RE.search(filename)
     if not m:
         raise ValueError(f"파일명에서 라벨을 추출할 수 없습니다: {filename}")
     return int(m.group(1))
@@ -68,8 +74,9 @@ def collect_training_data():
 def train_and_save_model():
     texts, labels = collect_training_data()
 
-    # 벡터화
-    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1,2))
+    # 벡터화 (float32 희소행렬: 모델 파일/추론 내적 크기 절반, 반복 토큰은 로그 스케일)
+    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1,2),
+                                 dtype=np.float32, sublinear_tf=True, norm="l2")
     X = vectorizer.fit_transform(texts)
     y = labels
 
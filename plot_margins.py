@@ -13,11 +13,13 @@ plot_margins.py
 작성: 당신의 분석 파이프라인에 바로 붙여 쓰세요.
 """
 import argparse
+import functools
 import math
 import os
 import sys
 from typing import List, Dict
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
@@ -26,6 +28,15 @@ import matplotlib as mpl
 # 헬퍼 함수
 # =========================
 
+_FONT_CONFIGURED = False  # 한 번 설정하면 이후 호출은 바로 반환
+
+
+@functools.lru_cache(maxsize=1)
+def _font_names() -> frozenset:
+    """시스템 폰트 목록 (get_font_names()는 느려서 프로세스당 한 번만 조회)"""
+    return frozenset(mpl.font_manager.get_font_names())
+
+
 def _enable_korean_font():
     """
     한글 깨짐(□) 방지:
@@ -34,10 +45,14 @@ def _enable_korean_font():
     - Linux    : NanumGothic(설치 시)
     폰트가 없으면 기본 폰트 유지(경고만).
     """
+    global _FONT_CONFIGURED
+    if _FONT_CONFIGURED:
+        return
     cand = ["Malgun Gothic", "AppleGothic", "NanumGothic", "Noto Sans CJK KR", "Noto Sans KR"]
     found = False
+    font_names = _font_names()
     for f in cand:
-        if f in mpl.font_manager.get_font_names():
+        if f in font_names:
             plt.rcParams["font.family"] = f
             found = True
             break
@@ -50,17 +65,8 @@ def _enable_korean_font():
             pass
     # 마이너스 기호가 □로 안 나오게
     plt.rcParams["axes.unicode_minus"] = False
+    _FONT_CONFIGURED = True
     
-def _safe_pct(num, denom):
-    """안전한 퍼센트 계산: 분모가 0/None/NaN이면 None 반환"""
-    try:
-        if denom is None or float(denom) == 0 or pd.isna(denom):
-            return None
-        return float(num) / float(denom) * 100.0
-    except Exception:
-        return None
-
-
 def _fmt_pct(x, digits=2) -> str:
     """백분율 문자열 포맷"""
     if x is None or (isinstance(x, float) and (math.isnan(x) or math.isinf(x))):
@@ -89,60 +95,53 @@ def _annotate_bars(ax, rects, values, offset=3):
 
 
 def _coerce_numeric(series):
-    """쉼표/공백/괄호음수 처리 등 느슨한 숫자 변환"""
-    def to_number(x):
-        if pd.isna(x):
-            return None
-        s = str(x).strip()
-        if s in {"", "-", "nan", "None", "null"}:
-            return None
-        neg = s.startswith("(") and s.endswith(")")
-        if neg:
-            s = s[1:-1]
-        s = s.replace(",", "")
-        try:
-            v = float(s)
-            return -v if neg else v
-        except Exception:
-            return None
-    return series.apply(to_number)
+    """쉼표/공백/괄호음수 처리 등 느슨한 숫자 변환 (열 전체를 pandas 문자열 연산으로 한 번에)"""
+    s = series.astype("string").str.strip()
+    s = s.mask(s.isin(["", "-", "nan", "None", "null"]))
+    neg = (s.str.startswith("(") & s.str.endswith(")")).fillna(False)
+    s = s.where(~neg, s.str.slice(1, -1)).str.replace(",", "", regex=False)
+    v = pd.to_numeric(s, errors="coerce").astype("float64")
+    return v.where(~neg, -v)
 
 
 # =========================
 # 핵심 로직
 # =========================
-def compute_margins(df: pd.DataFrame) -> pd.DataFrame:
+def compute_margins(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     입력 df(열: period, revenue, operating_profit, net_income) → 비율 계산 칼럼 추가
     - revenue는 '매출액 또는 총수익' 의미로 사용
+    - copy=True(기본): 입력은 그대로 두고 새 DataFrame 반환 / False: 입력 df에 바로 칼럼을 씀(호출부가 df를 소유할 때만)
     """
     need_cols = ["period", "revenue", "operating_profit", "net_income"]
     missing = [c for c in need_cols if c not in df.columns]
     if missing:
         raise ValueError(f"필수 컬럼 누락: {missing} (반드시 {need_cols} 필요)")
 
-    # 숫자형 강제 변환(문자 콤마/괄호 허용)
-    df = df.copy()
-    df["revenue"] = _coerce_numeric(df["revenue"])
-    df["operating_profit"] = _coerce_numeric(df["operating_profit"])
-    df["net_income"] = _coerce_numeric(df["net_income"])
+    # 숫자형 강제 변환(문자 콤마/괄호 허용) - 바뀌는 칼럼만 모아 두었다가 한 번에 씀
+    new_cols = {c: _coerce_numeric(df[c]) for c in ("revenue", "operating_profit", "net_income")}
 
     # 방어: 분모 음수/0/None 경고
     warn_rows = []
-    for i, row in df.iterrows():
-        rev = row["revenue"]
-        if rev is None or rev == 0:
-            warn_rows.append((row["period"], "분모가 없음(0 또는 결측)"))
+    for period, rev in zip(df["period"], new_cols["revenue"]):
+        if pd.isna(rev) or rev == 0:
+            warn_rows.append((period, "분모가 없음(0 또는 결측)"))
         elif rev < 0:
-            warn_rows.append((row["period"], "분모가 음수(데이터 확인 필요)"))
-
-    # 지표 계산
-    df["operating_margin_pct"] = [
-        _safe_pct(op, rev) for op, rev in zip(df["operating_profit"], df["revenue"])
-    ]
-    df["net_margin_pct"] = [
-        _safe_pct(ni, rev) for ni, rev in zip(df["net_income"], df["revenue"])
-    ]
+            warn_rows.append((period, "분모가 음수(데이터 확인 필요)"))
+
+    # 지표 계산 (분모 0/결측이면 NaN)
+    rev = new_cols["revenue"].to_numpy(dtype=float)
+    safe = (rev != 0) & ~np.isnan(rev)
+    for src, dst in (("operating_profit", "operating_margin_pct"), ("net_income", "net_margin_pct")):
+        pct = np.full_like(rev, np.nan)
+        np.divide(new_cols[src].to_numpy(dtype=float), rev, out=pct, where=safe)
+        new_cols[dst] = pct * 100.0
+
+    if copy:
+        df = df.assign(**new_cols)
+    else:
+        for c, v in new_cols.items():
+            df[c] = v
 
     # 경고 출력
     if warn_rows:
@@ -158,12 +157,16 @@ def plot_margins(
     title: str = "수익성(영업이익률 vs 순이익률)",
     out_png: str = "margins_chart.png",
     dpi: int = 120,
+    fig=None,
+    ax=None,
 ):
     """
     막대(영업/순이익률) + 꺾은선(각 비율의 추이) 동시 표시.
     - 라인 색상은 막대 색상과 '다르게' 보이도록 기본 팔레트에서 다른 색을 사용.
     - 각 막대 위에 % 라벨 표시.
     - 한글 폰트 자동 설정.
+    - 배치 호출: ax(및 fig)를 넘기면 새 Figure를 만들지 않고 비운 뒤 재사용(닫지 않음).
+      넘기지 않으면 새로 만든 Figure는 저장 후 닫음(pyplot에 쌓이지 않게).
     """
     _enable_korean_font()
 
@@ -175,7 +178,12 @@ def plot_margins(
     opm = df["operating_margin_pct"].tolist()
     npm = df["net_margin_pct"].tolist()
 
-    fig, ax = plt.subplots(figsize=(12, 5))
+    own_fig = ax is None
+    if own_fig:
+        fig, ax = plt.subplots(figsize=(12, 5))
+    else:
+        ax.clear()
+        fig = fig or ax.figure
 
     x = range(len(periods))
     width = 0.38
@@ -216,7 +224,9 @@ def plot_margins(
 
     ax.legend(loc="upper right")
     fig.tight_layout()
-    plt.savefig(out_png, dpi=dpi)
+    fig.savefig(out_png, dpi=dpi)
+    if own_fig:
+        plt.close(fig)
     print(f"[저장] 그래프 이미지: {out_png}")
 
 
@@ -234,7 +244,7 @@ def plot_margins_from_records(
     - 계산 결과 DataFrame을 반환
     """
     df = pd.DataFrame.from_records(records)
-    df2 = compute_margins(df)
+    df2 = compute_margins(df, copy=False)  # 여기서 만든 df라 제자리 변경 가능
     # 계산치 CSV도 함께 저장
     out_csv = os.path.splitext(out_png)[0] + "_values.csv"
     df2.to_csv(out_csv, index=False, encoding="utf-8-sig")
@@ -300,7 +310,7 @@ def main():
                             resolved["operating_profit"]: "operating_profit",
                             resolved["net_income"]: "net_income"})
 
-    df2 = compute_margins(df)
+    df2 = compute_margins(df, copy=False)  # rename이 만든 새 df
     out_csv = os.path.splitext(args.out)[0] + "_values.csv"
     df2.to_csv(out_csv, index=False, encoding="utf-8-sig")
     print(f"[저장] 계산값 CSV: {out_csv}")
@@ -1,14 +1,129 @@
 import xml.etree.ElementTree as ET
 import pandas as pd
 import os
+import time
+import pickle
+import functools
+import heapq
+import threading
 import config
-import dart_fss as dart
 
 api_key = config.API_KEY
 disc_url = 'https://opendart.fss.or.kr/api/list.json'
 # xbrl 원본 ZIP (binary)  # <<< CHANGED
 xbrl_url = 'https://opendart.fss.or.kr/api/fnlttXbrl.xml'   # <<< CHANGED
 DartFile_path = os.path.join(config.homePath, 'DartFile')
+# 기업목록 디스크 캐시 (유효기간 내면 다운로드/파싱 생략)
+CORP_LIST_CACHE = os.path.join(DartFile_path, 'corp_list.pkl')
+CORP_LIST_TTL = 24 * 60 * 60  # 초
+# reportfinder가 dart_fss를 부르는 상위 호출 사이 최소 간격(초)
+# (호출 하나가 내부에서 여러 번 HTTP 요청하므로 분당 한도를 보장하지는 않음)
+DART_MIN_INTERVAL = 0.07
+
+_dart_lock = threading.Lock()
+_dart_last_call = 0.0
+_corp_list = None  # 불러온 기업목록 (프로세스 내 메모)
+_corp_list_at = 0.0  # 기업목록 기준 시각 (디스크 캐시면 파일 수정시각)
+_corp_list_lock = threading.Lock()
+_filings_cache = {}  # (corp_code, bgn_de, end_de) → 사업보고서 목록
+_filings_lock = threading.Lock()
+# 정렬 키: rcept_dt(접수일자 YYYYMMDD), 없으면 가장 오래된 것으로 취급
+_by_rcept_dt = lambda f: getattr(f, 'rcept_dt', '')
+
+
+def _dart_throttle():
+    """여러 스레드가 동시에 조회해도 상위 DART 호출 사이 최소 간격을 보장"""
+    global _dart_last_call
+    with _dart_lock:
+        wait = _dart_last_call + DART_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _dart_last_call = time.monotonic()
+
+
+def search_annual_filings(corp, bgn_de: str, end_de: str | None) -> tuple:
+    """사업보고서(a001, 최종보고서만) 검색을 (corp_code, 기간)별로 한 번만 호출 - 추출과 debug가 공유"""
+    key = (corp.corp_code, bgn_de, end_de)
+    with _filings_lock:
+        if key in _filings_cache:
+            return _filings_cache[key]
+    _dart_throttle()
+    filings = tuple(corp.search_filings(
+        bgn_de=bgn_de,
+        end_de=end_de,
+        pblntf_detail_ty='a001',   # 사업보고서만
+        last_reprt_at='Y'          # (가능하면) 최종보고서만
+    ))
+    with _filings_lock:
+        _filings_cache[key] = filings
+    return filings
+
+
+@functools.lru_cache(maxsize=1)
+def _dart():
+    """dart_fss는 import 자체가 무겁고 API 키 설정도 필요하므로 처음 쓸 때 한 번만
+    (DART를 안 쓰는 경로는 import 비용 없음)"""
+    import dart_fss
+    dart_fss.set_api_key(api_key=config.API_KEY)
+    return dart_fss
+
+
+def _load_corp_list():
+    """(기업목록, 기준 시각). 디스크 캐시가 CORP_LIST_TTL 이내면 그것을, 아니면 DART에서 받아 디스크에 저장"""
+    dart = _dart()  # 캐시 pickle 복원에도 dart_fss 클래스가 필요
+    try:
+        mtime = os.path.getmtime(CORP_LIST_CACHE)
+        if time.time() - mtime < CORP_LIST_TTL:
+            with open(CORP_LIST_CACHE, 'rb') as f:
+                return pickle.load(f), mtime
+    except Exception:
+        pass  # 캐시 없음/손상 → 새로 받기
+
+    corp_list = dart.get_corp_list()
+    try:
+        os.makedirs(DartFile_path, exist_ok=True)
+        tmp_path = CORP_LIST_CACHE + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(corp_list, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CORP_LIST_CACHE)
+    except Exception as e:
+        print(f"[WARN] 기업목록 캐시 저장 실패: {e}")
+    return corp_list, time.time()
+
+
+def get_corp_list():
+    """기업목록은 프로세스 안에서 한 번만 불러와 재사용 (디스크 캐시는 첫 로드용).
+    CORP_LIST_TTL이 지나면 다시 불러오고 기업명 검색 캐시도 비움"""
+    global _corp_list, _corp_list_at
+    with _corp_list_lock:
+        if _corp_list is not None and time.time() - _corp_list_at < CORP_LIST_TTL:
+            return _corp_list
+        expired = _corp_list is not None
+        _corp_list, _corp_list_at = _load_corp_list()
+        if expired:
+            find_by_corp_name.cache_clear()
+            find_corp_candidates.cache_clear()
+        return _corp_list
+
+
+@functools.lru_cache(maxsize=None)
+def find_by_corp_name(corp_name: str, exactly: bool) -> tuple:
+    """corp_list.find_by_corp_name()은 전체 기업목록을 선형 탐색하므로 (기업명, 정확일치 여부)별로 캐시"""
+    return tuple(get_corp_list().find_by_corp_name(corp_name, exactly=exactly) or [])
+
+
+@functools.lru_cache(maxsize=None)
+def find_corp_candidates(corp_name: str) -> tuple:
+    """정확일치 → 유사검색 순으로 후보 기업을 모아 corp_code 기준 중복 제거 (기업명별 캐시)"""
+    hits_exact = find_by_corp_name(corp_name, True)
+    hits_fuzzy = find_by_corp_name(corp_name, False)
+    candidates = []
+    seen_codes = set()
+    for c in (hits_exact + hits_fuzzy):
+        if c.corp_code not in seen_codes:
+            candidates.append(c)
+            seen_codes.add(c.corp_code)
+    return tuple(candidates)
 
 
 def get_income_statement_df_by_name(corp_name: str,
@@ -21,20 +136,8 @@ def get_income_statement_df_by_name(corp_name: str,
     consolidated: True=연결 우선 (실패 시 개별로 폴백)
     """
     
-    dart.set_api_key(api_key=config.API_KEY)
-
-    # 1) 회사 객체
-    corp_list = dart.get_corp_list()
-    hits = corp_list.find_by_corp_name(corp_name, exactly=True)
-    # --- 후보 기업 전부 모으기(정확일치 먼저, 그 다음 유사검색) ----------------------
-    hits_exact = corp_list.find_by_corp_name(corp_name, exactly=True) or []     
-    hits_fuzzy = corp_list.find_by_corp_name(corp_name, exactly=False) or []    
-    candidates = []                                                              
-    seen_codes = set()                                                           
-    for c in (hits_exact + hits_fuzzy):                                          
-        if c.corp_code not in seen_codes:
-            candidates.append(c)
-            seen_codes.add(c.corp_code)
+    # 1) 회사 객체: 후보 기업 전부 모으기(정확일치 먼저, 그 다음 유사검색) ----------
+    candidates = find_corp_candidates(corp_name)
     if not candidates:                                                           
         raise ValueError(f"기업명을 찾지 못했습니다: {corp_name}")
 
@@ -44,19 +147,15 @@ def get_income_statement_df_by_name(corp_name: str,
     for corp in candidates:                                                      
         try:
             # 1) 사업보고서만 검색 (a001)
-            filings = corp.search_filings(
-                bgn_de=bgn_de,
-                end_de=end_de,
-                pblntf_detail_ty='a001',   # 사업보고서만
-                last_reprt_at='Y'          # (가능하면) 최종보고서만
-            )
+            filings = search_annual_filings(corp, bgn_de, end_de)
             if len(filings) == 0:
                 raise ValueError("검색 기간 내 사업보고서 없음")
 
             # 최신 1건 선택
-            filing = sorted(filings, key=lambda f: getattr(f, 'rcept_dt', ''), reverse=True)[0]
+            filing = max(filings, key=_by_rcept_dt)
 
             # 2) XBRL → 손익계산서(IS) 우선, 안 되면 개별 폴백
+            _dart_throttle()
             xbrl = getattr(filing, "xbrl", None)
             tables = []
             if xbrl is not None:
@@ -66,12 +165,14 @@ def get_income_statement_df_by_name(corp_name: str,
 
             # 3) IS가 전혀 안 잡히면 extract_fs로 IS→CIS 순서로 폴백
             if not tables:
+                _dart_throttle()
                 fs = corp.extract_fs(bgn_de=bgn_de, end_de=end_de, fs_tp=('is','cis'))
-                df_is = fs.get('is') if hasattr(fs, 'get') else None
+                fs_get = getattr(fs, 'get', None)  # 한 번만 확인
+                df_is = fs_get('is') if fs_get is not None else None
                 if isinstance(df_is, pd.DataFrame) and not df_is.empty:
                     best_df = df_is
                 else:
-                    df_cis = fs.get('cis') if hasattr(fs, 'get') else None
+                    df_cis = fs_get('cis') if fs_get is not None else None
                     if isinstance(df_cis, pd.DataFrame) and not df_cis.empty:
                         best_df = df_cis
                     else:
@@ -82,8 +183,11 @@ def get_income_statement_df_by_name(corp_name: str,
                 best_df = max(dfs, key=lambda d: d.shape[0])
 
             # 4) 공통 클린업 후 성공 반환
-            best_df.columns = [str(c).strip() for c in best_df.columns]
-            best_df = best_df[~best_df.apply(lambda r: r.astype(str).str.contains("단위").any(), axis=1)]
+            # extract_fs 결과는 fs 객체가 들고 있는 DataFrame이므로 제자리 변경 대신 새 축으로
+            best_df = best_df.set_axis([str(c).strip() for c in best_df.columns], axis=1)
+            # '단위' 안내 행 제거 (행마다가 아니라 열 단위로 한 번에 검사)
+            has_unit = best_df.astype(str).apply(lambda col: col.str.contains("단위", regex=False)).any(axis=1)
+            best_df = best_df[~has_unit]
 
             # (옵션) 어떤 코드로 성공했는지 로그
             print(f"[OK] {corp.corp_name}({corp.corp_code}) 사업보고서에서 추출 성공: "
@@ -100,35 +204,25 @@ def get_income_statement_df_by_name(corp_name: str,
 def debug_income_statement(corp_name: str, bgn_de: str, end_de: str | None = None) -> None:
     """기업 선택, 사업보고서(a001) 목록, XBRL 유무, 역할(role) 이름을 빠르게 점검"""
     try:
-        dart.set_api_key(api_key=config.API_KEY)
-    except Exception:
-        pass
-
-    try:
-        corp_list = dart.get_corp_list()
-        hits = corp_list.find_by_corp_name(corp_name, exactly=False)
+        hits = find_by_corp_name(corp_name, False)  # 기업목록/검색 결과 캐시 공유
         print("\n[DEBUG] 후보 기업들:", [(c.corp_name, c.corp_code) for c in hits[:5]])
         if not hits:
             print("[DEBUG] 기업 검색 결과 없음"); return
         corp = hits[0]
 
-        filings = corp.search_filings(
-            bgn_de=bgn_de, end_de=end_de,
-            pblntf_detail_ty='a001',  # 사업보고서
-            last_reprt_at='Y'
-        )
+        filings = search_annual_filings(corp, bgn_de, end_de)
         if len(filings) == 0:
             print("[DEBUG] 기간 내 사업보고서 없음"); return
 
         # 최신순 상위 3건만 출력
-        filings = sorted(filings, key=lambda f: getattr(f, 'rcept_dt', ''), reverse=True)
+        top = heapq.nlargest(3, filings, key=_by_rcept_dt)
         print("[DEBUG] 사업보고서 상위 3건:")
-        for f in filings[:3]:
+        for f in top:
             print(" -", getattr(f, 'rcept_dt', ''), getattr(f, 'report_nm', ''), 
                   "xbrl?", bool(getattr(f, 'xbrl', None)), "rcept_no:", getattr(f, 'rcept_no', ''))
 
-        # 가장 최신 건의 역할(role) 이름 훑기
-        xbrl = getattr(filings[0], 'xbrl', None)
+        # 가장 최신 건의 역할(role) 이름 훑기 (Report가 파싱한 XBRL을 들고 있어 다시 받지 않음)
+        xbrl = getattr(top[0], 'xbrl', None)
         if xbrl is None:
             print("[DEBUG] 최신 사업보고서에 XBRL 연결이 없음"); return
 